@@ -13,14 +13,18 @@ WHITELIST MODE:
 from __future__ import annotations
 
 import argparse
-import html as html_mod
+import io
+import json
+import os
 import re
 import subprocess
+import sys
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from email.utils import format_datetime
+from html.parser import HTMLParser
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 
 ALLOWED_PAGES = {
@@ -33,11 +37,32 @@ ALLOWED_PAGES = {
     "guestbook.html",
 }
 
-TITLE_RE = re.compile(r"<title>(?P<v>.*?)</title>", re.IGNORECASE | re.DOTALL)
-DESC_RE = re.compile(
-    r'<meta\s+name\s*=\s*(?P<q>["\'])description(?P=q)\s+content\s*=\s*(?P<q2>["\'])(?P<v>.*?)(?P=q2)\s*/?>',
-    re.IGNORECASE | re.DOTALL,
-)
+# Heads sit at the top of the file; the parser is fed in chunks of this size and stops early.
+HEAD_CHUNK_CHARS = 16384
+
+WS_RE = re.compile(r"\s+")
+
+COMMIT_MARKER = b"COMMIT\t"
+
+# Stored in every title/description cache entry. Bump it whenever the extraction rules change
+# (HeadInfo / _extract_title_desc) so entries written by an older extractor are recomputed.
+META_CACHE_VERSION = 1
+
+# Lets path-scoped `git log` consult the changed-paths Bloom filters in the commit-graph.
+COMMIT_GRAPH_CONFIG = ["-c", "core.commitGraph=true", "-c", "commitGraph.readChangedPaths=true"]
+
+# Commit-graph file layout: "CGPH" signature, 4 header bytes (chunk count at offset 6), then a
+# table of (chunk count + 1) 12-byte entries. The changed-paths filters live in the BIDX chunk.
+COMMIT_GRAPH_SIGNATURE = b"CGPH"
+COMMIT_GRAPH_BLOOM_CHUNK = b"BIDX"
+
+
+@dataclass(frozen=True)
+class GitLayout:
+    # repo_root relative to the work tree top: b"" or ending in b"/" (log paths are top-relative).
+    prefix: bytes
+    commit_graph: Path
+    commit_graphs: Path
 
 
 @dataclass(frozen=True)
@@ -49,20 +74,91 @@ class Item:
     pub_date: datetime
 
 
-def _run_git(args: List[str], cwd: Path) -> str:
+def _run_git(args: List[str], cwd: Path, config: Optional[List[str]] = None) -> bytes:
+    # Raw bytes: callers decode only the few fields they actually use.
     res = subprocess.run(
-        ["git", *args],
+        ["git", *(config or []), *args],
         cwd=str(cwd),
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
-        text=True,
         check=False,
     )
     if res.returncode != 0:
-        raise RuntimeError(res.stderr.strip() or "git command failed")
+        raise RuntimeError(res.stderr.decode("utf-8", errors="replace").strip() or "git command failed")
     return res.stdout.strip()
 
 
+def _git_layout(repo_root: Path) -> Optional[GitLayout]:
+    # Everything later steps need from rev-parse, in one call. --show-prefix goes last: at the
+    # work tree top it prints an empty line, which the output strip drops.
+    try:
+        out = _run_git(
+            [
+                "rev-parse",
+                "--git-path",
+                "objects/info/commit-graph",
+                "--git-path",
+                "objects/info/commit-graphs",
+                "--show-prefix",
+            ],
+            cwd=repo_root,
+        )
+    except Exception:
+        return None
+
+    lines = out.splitlines()
+    if len(lines) not in (2, 3):
+        return None
+    return GitLayout(
+        prefix=lines[2] if len(lines) == 3 else b"",
+        commit_graph=repo_root / os.fsdecode(lines[0]),
+        commit_graphs=repo_root / os.fsdecode(lines[1]),
+    )
+
+
+def _graph_file_has_bloom(path: Path) -> bool:
+    try:
+        with path.open("rb") as f:
+            header = f.read(8)
+            if len(header) != 8 or header[:4] != COMMIT_GRAPH_SIGNATURE:
+                return False
+            table = f.read(12 * (header[6] + 1))
+    except OSError:
+        return False
+    return any(table[i : i + 4] == COMMIT_GRAPH_BLOOM_CHUNK for i in range(0, len(table), 12))
+
+
+def _commit_graph_has_bloom(layout: GitLayout) -> bool:
+    # git reads a single commit-graph file first, else the split chain. `git gc` writes graphs
+    # without changed-paths data, so a graph existing is not enough.
+    if layout.commit_graph.exists():
+        return _graph_file_has_bloom(layout.commit_graph)
+
+    try:
+        chain = (layout.commit_graphs / "commit-graph-chain").read_text(encoding="ascii").split()
+    except (OSError, ValueError):
+        return False
+    return len(chain) > 0 and all(_graph_file_has_bloom(layout.commit_graphs / f"graph-{h}.graph") for h in chain)
+
+
+def _ensure_commit_graph(repo_root: Path, layout: GitLayout) -> List[str]:
+    """
+    Write a commit-graph with changed-paths Bloom filters unless the current one already has them.
+
+    Returns the git config flags to pass to later log queries.
+    """
+    if _commit_graph_has_bloom(layout) is False:
+        subprocess.run(
+            ["git", "commit-graph", "write", "--reachable", "--changed-paths"],
+            cwd=str(repo_root),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False,
+        )
+
+    return COMMIT_GRAPH_CONFIG
+
+
 def _read_text_safe(fp: Path) -> str:
     try:
         return fp.read_text(encoding="utf-8")
@@ -70,45 +166,179 @@ def _read_text_safe(fp: Path) -> str:
         return fp.read_text(encoding="utf-8", errors="replace")
 
 
+class _HeadDone(Exception):
+    pass
+
+
+class HeadInfo(HTMLParser):
+    """
+    Collects the first <title> text and <meta name="description"> content, then stops.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.title: Optional[str] = None
+        self.description: Optional[str] = None
+        self._title_parts: Optional[List[str]] = None
+
+    def handle_starttag(self, tag: str, attrs: List[tuple[str, Optional[str]]]) -> None:
+        if tag == "title" and self.title is None:
+            self._title_parts = []
+        elif tag == "meta" and self.description is None:
+            a = dict(attrs)
+            if (a.get("name") or "").lower() == "description" and a.get("content") is not None:
+                self.description = a["content"]
+                self._check_done()
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "title" and self._title_parts is not None:
+            self.title = "".join(self._title_parts)
+            self._title_parts = None
+            self._check_done()
+
+    def handle_data(self, data: str) -> None:
+        if self._title_parts is not None:
+            self._title_parts.append(data)
+
+    def _check_done(self) -> None:
+        if self.title is not None and self.description is not None:
+            raise _HeadDone
+
+
 def _extract_title_desc(html: str, fallback_title: str) -> tuple[str, str]:
     title = fallback_title
     desc = ""
 
-    tm = TITLE_RE.search(html)
-    if tm is not None:
-        t_raw = re.sub(r"\s+", " ", tm.group("v")).strip()
+    parser = HeadInfo()
+    try:
+        for i in range(0, len(html), HEAD_CHUNK_CHARS):
+            parser.feed(html[i : i + HEAD_CHUNK_CHARS])
+    except _HeadDone:
+        pass
+
+    if parser.title is not None:
+        t_raw = WS_RE.sub(" ", parser.title).strip()
         if len(t_raw) > 0:
-            title = html_mod.unescape(t_raw)
+            title = t_raw
 
-    dm = DESC_RE.search(html)
-    if dm is not None:
-        d_raw = re.sub(r"\s+", " ", dm.group("v")).strip()
+    if parser.description is not None:
+        d_raw = WS_RE.sub(" ", parser.description).strip()
         if len(d_raw) > 0:
-            desc = html_mod.unescape(d_raw)
+            desc = d_raw
 
     return title, desc
 
 
-def _last_commit_datetime(repo_root: Path, file_path: Path) -> Optional[datetime]:
+def _parse_commit_datetime(raw: bytes) -> Optional[datetime]:
     # ISO 8601 committer date: 2025-12-18T09:10:00+03:00
+    try:
+        dt = datetime.fromisoformat(raw.strip().decode("ascii"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _bulk_last_commit_datetimes(
+    repo_root: Path,
+    names: List[str],
+    prefix: bytes = b"",
+    git_config: Optional[List[str]] = None,
+) -> Dict[str, datetime]:
+    """
+    Last commit date per file, from a single `git log` over all names.
+
+    git log is newest-first, so the first commit listing a file is the latest one touching it.
+    Listed paths are relative to the work tree top, hence `prefix` (repo_root's place in it).
+    -c lists a merge's files only where the result differs from every parent: a conflict
+    resolution counts, a plain PR merge does not, which matches per-file `git log -1 -- <file>`.
+    """
+    if len(names) == 0:
+        return {}
+
     try:
         out = _run_git(
-            ["log", "-1", "--format=%cI", "--", file_path.as_posix()],
+            ["log", "-c", "--name-only", f"--format={COMMIT_MARKER.decode('ascii')}%cI", "--", *names],
             cwd=repo_root,
+            config=git_config,
         )
     except Exception:
-        return None
+        return {}
 
-    if out.strip() == "":
-        return None
+    # Filenames are matched as bytes; only the hits get decoded.
+    wanted = {prefix + os.fsencode(n): n for n in names}
+    result: Dict[str, datetime] = {}
+    current: Optional[datetime] = None
+
+    for line in out.splitlines():
+        if line.startswith(COMMIT_MARKER):
+            current = _parse_commit_datetime(line[len(COMMIT_MARKER) :])
+            continue
+
+        name = wanted.get(line.strip())
+        if name is None or current is None:
+            continue
+        if name not in result:
+            result[name] = current
+            if len(result) == len(wanted):
+                break
+
+    return result
 
+
+def _load_meta_cache(path: Path) -> Dict[str, Dict[str, Any]]:
     try:
-        dt = datetime.fromisoformat(out.strip())
-        if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=timezone.utc)
-        return dt
-    except ValueError:
-        return None
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _save_meta_cache(path: Path, cache: Dict[str, Dict[str, Any]]) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(cache, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    except OSError as e:
+        # stderr: without --write the feed itself goes to stdout.
+        print(f"[warn] could not write cache {path}: {e}", file=sys.stderr)
+
+
+def _cached_title_desc(
+    cache: Dict[str, Dict[str, Any]],
+    name: str,
+    fp: Path,
+    st_mtime_ns: int,
+    st_size: int,
+) -> tuple[str, str, bool]:
+    """
+    Title/description for a page, reusing the cache entry while mtime and size still match and
+    the entry was written by the current extractor (META_CACHE_VERSION).
+
+    Returns (title, description, cache_updated).
+    """
+    entry = cache.get(name)
+    if (
+        isinstance(entry, dict)
+        and entry.get("version") == META_CACHE_VERSION
+        and entry.get("mtime_ns") == st_mtime_ns
+        and entry.get("size") == st_size
+        and isinstance(entry.get("title"), str)
+        and isinstance(entry.get("description"), str)
+    ):
+        return entry["title"], entry["description"], False
+
+    html = _read_text_safe(fp)
+    fallback_title = f"{name} updated"
+    title, desc = _extract_title_desc(html, fallback_title)
+    cache[name] = {
+        "version": META_CACHE_VERSION,
+        "mtime_ns": st_mtime_ns,
+        "size": st_size,
+        "title": title,
+        "description": desc,
+    }
+    return title, desc, True
 
 
 def _page_link(base_url: str, rel: str) -> str:
@@ -118,44 +348,60 @@ def _page_link(base_url: str, rel: str) -> str:
     return base + rel
 
 
+_XML_ESCAPE_TABLE = str.maketrans(
+    {
+        "&": "&amp;",
+        "<": "&lt;",
+        ">": "&gt;",
+        '"': "&quot;",
+        "'": "&apos;",
+    }
+)
+
+
 def _xml_escape(s: str) -> str:
-    return (
-        s.replace("&", "&amp;")
-        .replace("<", "&lt;")
-        .replace(">", "&gt;")
-        .replace('"', "&quot;")
-        .replace("'", "&apos;")
-    )
+    return s.translate(_XML_ESCAPE_TABLE)
+
+
+CHANNEL_TITLE_XML = _xml_escape("Necdet Şanlı — Site Updates")
+CHANNEL_DESCRIPTION_XML = _xml_escape("Updates across the site pages.")
 
 
 def _render_rss(base_url: str, items: List[Item]) -> str:
     now = datetime.now(timezone.utc)
     last_build = format_datetime(now)
 
-    out: List[str] = []
-    out.append('<?xml version="1.0" encoding="UTF-8"?>')
-    out.append('<rss version="2.0">')
-    out.append("  <channel>")
-    out.append(f"    <title>{_xml_escape('Necdet Şanlı — Site Updates')}</title>")
-    out.append(f"    <link>{_xml_escape(base_url.rstrip('/') + '/')}</link>")
-    out.append(f"    <description>{_xml_escape('Updates across the site pages.')}</description>")
-    out.append("    <language>en</language>")
-    out.append(f"    <lastBuildDate>{_xml_escape(last_build)}</lastBuildDate>")
+    buf = io.StringIO()
+    w = buf.write
+    w('<?xml version="1.0" encoding="UTF-8"?>\n')
+    w('<rss version="2.0">\n')
+    w("  <channel>\n")
+    w(f"    <title>{CHANNEL_TITLE_XML}</title>\n")
+    w(f"    <link>{_xml_escape(base_url.rstrip('/') + '/')}</link>\n")
+    w(f"    <description>{CHANNEL_DESCRIPTION_XML}</description>\n")
+    w("    <language>en</language>\n")
+    w(f"    <lastBuildDate>{_xml_escape(last_build)}</lastBuildDate>\n")
 
     for it in items:
-        pub = format_datetime(it.pub_date)
-        out.append("    <item>")
-        out.append(f"      <title>{_xml_escape(it.title)}</title>")
-        out.append(f"      <link>{_xml_escape(it.link)}</link>")
-        out.append(f'      <guid isPermaLink="true">{_xml_escape(it.link)}</guid>')
-        out.append(f"      <pubDate>{_xml_escape(pub)}</pubDate>")
+        link = _xml_escape(it.link)
+        w("    <item>\n      <title>")
+        w(_xml_escape(it.title))
+        w("</title>\n      <link>")
+        w(link)
+        w('</link>\n      <guid isPermaLink="true">')
+        w(link)
+        w("</guid>\n      <pubDate>")
+        w(_xml_escape(format_datetime(it.pub_date)))
+        w("</pubDate>\n")
         if it.description.strip() != "":
-            out.append(f"      <description>{_xml_escape(it.description)}</description>")
-        out.append("    </item>")
+            w("      <description>")
+            w(_xml_escape(it.description))
+            w("</description>\n")
+        w("    </item>\n")
 
-    out.append("  </channel>")
-    out.append("</rss>")
-    return "\n".join(out) + "\n"
+    w("  </channel>\n")
+    w("</rss>\n")
+    return buf.getvalue()
 
 
 def main() -> int:
@@ -165,6 +411,18 @@ def main() -> int:
     parser.add_argument("--limit", type=int, default=50, help="Max item count.")
     parser.add_argument("--out", type=str, default="feed.xml", help="Output file path (relative to root).")
     parser.add_argument("--write", action="store_true", help="Write file. Without this, prints to stdout.")
+    parser.add_argument(
+        "--use-commit-graph",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Write/use a commit-graph with changed-paths Bloom filters to speed up log queries.",
+    )
+    parser.add_argument(
+        "--cache",
+        type=str,
+        default=".cache/rss_meta.json",
+        help="Title/description cache keyed by file mtime+size (relative to root). Empty disables it.",
+    )
     args = parser.parse_args()
 
     script_dir = Path(__file__).resolve().parent
@@ -172,19 +430,34 @@ def main() -> int:
 
     items: List[Item] = []
 
+    cache_path = (repo_root / args.cache) if args.cache.strip() != "" else None
+    cache = _load_meta_cache(cache_path) if cache_path is not None else {}
+    cache_dirty = False
+
+    layout = _git_layout(repo_root)
+    git_config = _ensure_commit_graph(repo_root, layout) if layout is not None and args.use_commit_graph else None
+    commit_dates = _bulk_last_commit_datetimes(
+        repo_root,
+        sorted(ALLOWED_PAGES),
+        prefix=layout.prefix if layout is not None else b"",
+        git_config=git_config,
+    )
+
     for name in sorted(ALLOWED_PAGES):
         fp = repo_root / name
         if fp.exists() is False:
             print(f"[warn] missing page, skipping: {fp}")
             continue
 
-        dt = _last_commit_datetime(repo_root, fp)
+        st = fp.stat()
+
+        # Commit dates are not cached: a commit can land without touching the file's mtime.
+        dt = commit_dates.get(name)
         if dt is None:
-            dt = datetime.fromtimestamp(fp.stat().st_mtime, tz=timezone.utc)
+            dt = datetime.fromtimestamp(st.st_mtime, tz=timezone.utc)
 
-        html = _read_text_safe(fp)
-        fallback_title = f"{name} updated"
-        title, desc = _extract_title_desc(html, fallback_title)
+        title, desc, updated = _cached_title_desc(cache, name, fp, st.st_mtime_ns, st.st_size)
+        cache_dirty = cache_dirty or updated
 
         rel = name
         items.append(
@@ -197,6 +470,9 @@ def main() -> int:
             )
         )
 
+    if cache_path is not None and cache_dirty:
+        _save_meta_cache(cache_path, cache)
+
     items.sort(key=lambda x: x.pub_date, reverse=True)
     items = items[: max(1, int(args.limit))]
 
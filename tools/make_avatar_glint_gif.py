@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import math
 from pathlib import Path
 from typing import Tuple
 
-from PIL import Image, ImageChops, ImageDraw, ImageEnhance, ImageFilter
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
 
 
 INPUT = "me.jpg"
@@ -20,6 +22,8 @@ BAND_WIDTH_RATIO = 0.12
 BLUR_RADIUS = 8
 INTENSITY = 0.55 
 
+PALETTE_COLORS = 256  # per-frame adaptive palette; lower (e.g. 64) for smaller files
+
 
 def resize_keep_aspect(img: Image.Image, max_h: int) -> Image.Image:
     w, h = img.size
@@ -31,23 +35,46 @@ def resize_keep_aspect(img: Image.Image, max_h: int) -> Image.Image:
     return img.resize((new_w, new_h), Image.LANCZOS)
 
 
-def make_glint_mask(size: Tuple[int, int], x: int, band_w: int) -> Image.Image:
+def make_glint_band(size: Tuple[int, int], start: int, end: int, band_w: int) -> np.ndarray:
+    """
+    Blur + rotate the glint band once, on a canvas wide enough for the whole sweep.
+
+    Frames are horizontal slices of the returned (h, W) array; see glint_offset().
+    """
     w, h = size
     pad = max(w, h)
-    W, H = w + pad * 2, h + pad * 2
+    sweep = glint_offset(start, end)
+    pad_y = pad + sweep
+    W, H = w + sweep + pad * 2, h + pad_y * 2
 
-    mask_big = Image.new("L", (W, H), 0)
-    d = ImageDraw.Draw(mask_big)
+    band_big = Image.new("L", (W, H), 0)
+    d = ImageDraw.Draw(band_big)
 
-    bx = x + pad
+    # Drawn where the last frame sees it; earlier frames look further right on the canvas.
+    bx = end + pad
     d.rectangle([bx, 0, bx + band_w, H], fill=255)
 
-    mask_big = mask_big.filter(ImageFilter.GaussianBlur(radius=BLUR_RADIUS))
-    mask_big = mask_big.rotate(ANGLE_DEG, resample=Image.BICUBIC, expand=False)
+    band_big = band_big.filter(ImageFilter.GaussianBlur(radius=BLUR_RADIUS))
+    band_big = band_big.rotate(
+        ANGLE_DEG,
+        resample=Image.BICUBIC,
+        expand=False,
+        center=(pad + w / 2.0, pad_y + h / 2.0),
+    )
+
+    band = np.asarray(band_big, dtype=np.float32)[pad_y : pad_y + h, pad:]
+    return np.rint(band * INTENSITY).astype(np.uint8)
+
 
-    mask = mask_big.crop((pad, pad, pad + w, pad + h))
-    mask = ImageEnhance.Brightness(mask).enhance(INTENSITY)
-    return mask
+def glint_offset(x: int, end: int) -> int:
+    # Moving the band by dx across its own axis is a horizontal shift of dx / cos(angle).
+    return int(round((end - x) / math.cos(math.radians(ANGLE_DEG))))
+
+
+def screen(base: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    # base (h, w, 3); mask (..., h, w) -> (..., h, w, 3)
+    inv = (255 - base.astype(np.uint16)) * (255 - mask.astype(np.uint16))[..., None]
+    return (255 - inv // 255).astype(np.uint8)
 
 
 def main() -> None:
@@ -66,17 +93,22 @@ def main() -> None:
     start = -int(w * 0.6) - band_w
     end = int(w * 1.6)
 
-    frames = []
-    for i in range(FRAMES):
-        t = i / max(1, (FRAMES - 1))
-        x = int(round(start + (end - start) * t))
+    band = make_glint_band((w, h), start=start, end=end, band_w=band_w)
+    base_np = np.asarray(base_rgb, dtype=np.uint8)
 
-        mask = make_glint_mask((w, h), x=x, band_w=band_w)
+    xs = [int(round(start + (end - start) * (i / max(1, (FRAMES - 1))))) for i in range(FRAMES)]
+    offsets = [glint_offset(x, end) for x in xs]
 
-        glint_rgb = Image.merge("RGB", (mask, mask, mask))
+    # (h, n, w) strided view of every w-wide window; pick one per frame -> (FRAMES, h, w).
+    windows = np.lib.stride_tricks.sliding_window_view(band, w, axis=1)
+    masks = windows[:, offsets].transpose(1, 0, 2)
 
-        frame_rgb = ImageChops.screen(base_rgb, glint_rgb)
-        frames.append(frame_rgb)
+    frames_np = screen(base_np, masks)
+
+    frames = []
+    for frame_np in frames_np:
+        frame_rgb = Image.fromarray(frame_np, "RGB")
+        frames.append(frame_rgb.convert("P", palette=Image.Palette.ADAPTIVE, colors=PALETTE_COLORS))
 
     frames[0].save(
         Path(OUTPUT),
@@ -84,7 +116,7 @@ def main() -> None:
         append_images=frames[1:],
         duration=DURATION_MS,
         loop=0,
-        optimize=True,
+        optimize=False,
     )
 
     print(f"Wrote {OUTPUT} ({w}x{h}, {FRAMES} frames)")
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import functools
 import math
 from pathlib import Path
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
 
 
 def pick_font(paths: list[str], size: int) -> ImageFont.FreeTypeFont:
@@ -18,8 +19,30 @@ def text_bbox(draw: ImageDraw.ImageDraw, text: str, font: ImageFont.ImageFont) -
     return draw.textbbox((0, 0), text, font=font)
 
 
+_MEASURE_DRAW = ImageDraw.Draw(Image.new("RGBA", (10, 10), (0, 0, 0, 0)))
+
+
+@functools.lru_cache(maxsize=None)
+def token_width(text: str, font: ImageFont.ImageFont) -> int:
+    # Tokens repeat across the strip; measure each (text, font) once.
+    b = text_bbox(_MEASURE_DRAW, text, font)
+    return b[2] - b[0]
+
+
+@functools.lru_cache(maxsize=None)
+def glyph_masks(text: str, font: ImageFont.ImageFont, stroke_px: int) -> tuple[Image.Image, Image.Image | None]:
+    # Glyph and dilated stroke masks, padded by stroke_px on every side.
+    pad = stroke_px
+    _l, _t, r, b = font.getbbox(text)
+    glyph = Image.new("L", (max(1, r) + pad * 2, max(1, b) + pad * 2), 0)
+    ImageDraw.Draw(glyph).text((pad, pad), text, font=font, fill=255)
+
+    stroke = glyph.filter(ImageFilter.MaxFilter(stroke_px * 2 + 1)) if stroke_px > 0 else None
+    return glyph, stroke
+
+
 def draw_with_effects(
-    draw: ImageDraw.ImageDraw,
+    img: Image.Image,
     x: int,
     y: int,
     text: str,
@@ -31,26 +54,23 @@ def draw_with_effects(
     shadow_dx: int,
     shadow_dy: int,
 ) -> None:
-    
-    draw.text((x + shadow_dx, y + shadow_dy), text, font=font, fill=shadow_rgba)
+    # Rasterize the glyphs once; shadow, stroke and fill are all pastes through masks.
+    glyph, stroke = glyph_masks(text, font, stroke_px)
+
+    ox, oy = x - stroke_px, y - stroke_px
+
+    img.paste(shadow_rgba, (ox + shadow_dx, oy + shadow_dy), glyph)
 
-    for ox in range(-stroke_px, stroke_px + 1):
-        for oy in range(-stroke_px, stroke_px + 1):
-            if ox == 0 and oy == 0:
-                continue
-            if (ox * ox + oy * oy) > (stroke_px * stroke_px):
-                continue
-            draw.text((x + ox, y + oy), text, font=font, fill=stroke_rgba)
+    if stroke is not None:
+        img.paste(stroke_rgba, (ox, oy), stroke)
 
     # Fill
-    draw.text((x, y), text, font=font, fill=fill_rgba)
+    img.paste(fill_rgba, (ox, oy), glyph)
 
 
 def main() -> None:
     view_w, view_h = 306, 45
 
-    scale = 3
-
     step_px = 2  
     frame_ms = 40 
 
@@ -65,13 +85,13 @@ def main() -> None:
             r"C:\Windows\Fonts\segoeuib.ttf",  # Segoe UI Bold
             r"C:\Windows\Fonts\trebucbd.ttf",  # Trebuchet Bold
         ],
-        size=30 * scale,
+        size=30,
     )
     symbol_font = pick_font(
         [
             r"C:\Windows\Fonts\seguisym.ttf",  # Segoe UI Symbol (✦)
         ],
-        size=30 * scale,
+        size=30,
     )
 
     tokens_one_unit: list[tuple[str, ImageFont.ImageFont]] = [
@@ -81,16 +101,12 @@ def main() -> None:
         ("  ", main_font),
     ]
 
-    tmp = Image.new("RGBA", (10, 10), (0, 0, 0, 0))
-    dtmp = ImageDraw.Draw(tmp)
-
-    unit_w_hi = 0
+    unit_w = 0
     max_ascent = 0
     max_descent = 0
 
     for t, f in tokens_one_unit:
-        b = text_bbox(dtmp, t, f)
-        unit_w_hi += (b[2] - b[0])
+        unit_w += token_width(t, f)
 
         ascent, descent = f.getmetrics()
         if ascent > max_ascent:
@@ -98,56 +114,50 @@ def main() -> None:
         if descent > max_descent:
             max_descent = descent
 
-    line_h_hi = max_ascent + max_descent
+    line_h = max_ascent + max_descent
 
-    needed_hi = (view_w * scale) + unit_w_hi + 200
-    repeats = max(6, math.ceil(needed_hi / max(1, unit_w_hi)) + 2)
+    needed = view_w + unit_w + 200
+    repeats = max(6, math.ceil(needed / max(1, unit_w)) + 2)
 
     tokens = tokens_one_unit * repeats
 
-    strip_w_hi = unit_w_hi * repeats
-    strip_h_hi = view_h * scale
+    # Rendered at the output size: FreeType already antialiases, no need to oversample.
+    strip_w = unit_w * repeats
 
-    strip_hi = Image.new("RGBA", (strip_w_hi, strip_h_hi), (0, 0, 0, 0))
-    d = ImageDraw.Draw(strip_hi)
+    strip = Image.new("RGBA", (strip_w, view_h), (0, 0, 0, 0))
 
-    baseline_y_hi = (strip_h_hi - line_h_hi) // 2 + max_ascent
+    baseline_y = (view_h - line_h) // 2 + max_ascent
 
-    symbol_y_adjust_hi = 0  # try: -1 * scale
+    symbol_y_adjust = 0  # try: -1
 
-    x_hi = 0
+    x = 0
     for t, f in tokens:
         ascent, _descent = f.getmetrics()
-        y_token_hi = baseline_y_hi - ascent
+        y_token = baseline_y - ascent
 
         if t == "✦":
-            y_token_hi += symbol_y_adjust_hi
+            y_token += symbol_y_adjust
 
         draw_with_effects(
-            draw=d,
-            x=x_hi,
-            y=y_token_hi,
+            img=strip,
+            x=x,
+            y=y_token,
             text=t,
             font=f,
             fill_rgba=blue,
             stroke_rgba=white,
-            stroke_px=2 * scale,
+            stroke_px=2,
             shadow_rgba=shadow,
-            shadow_dx=2 * scale,
-            shadow_dy=2 * scale,
+            shadow_dx=2,
+            shadow_dy=2,
         )
 
-        b = text_bbox(d, t, f)
-        x_hi += (b[2] - b[0])
-
-    strip_w = strip_w_hi // scale
-    strip = strip_hi.resize((strip_w, view_h), Image.LANCZOS)
+        x += token_width(t, f)
 
     strip2 = Image.new("RGBA", (strip_w * 2, view_h), (0, 0, 0, 0))
     strip2.paste(strip, (0, 0))
     strip2.paste(strip, (strip_w, 0))
 
-    unit_w = unit_w_hi // scale
     offsets = list(range(0, unit_w, step_px))
 
     frames: list[Image.Image] = []
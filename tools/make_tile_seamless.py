@@ -7,20 +7,36 @@ from typing import List, Tuple
 from PIL import Image, ImageSequence
 
 
-def make_seamless_frame(frame: Image.Image) -> Image.Image:
-    rgba = frame.convert("RGBA")
-    w, h = rgba.size
+class SeamlessTiler:
+    """
+    Mirror-tiles frames of one size into a reused 2w x 2h canvas.
+
+    The four pastes cover the whole canvas, so nothing needs clearing between frames.
+    """
+
+    def __init__(self, size: Tuple[int, int]) -> None:
+        w, h = size
+        self.size = size
+        self.big = Image.new("RGBA", (w * 2, h * 2), (0, 0, 0, 0))
+        self.box = (w // 2, h // 2, w // 2 + w, h // 2 + h)
 
-    big = Image.new("RGBA", (w * 2, h * 2), (0, 0, 0, 0))
+    def tile(self, frame: Image.Image) -> Image.Image:
+        rgba = frame.convert("RGBA")
+        if rgba.size != self.size:
+            raise ValueError(f"frame size {rgba.size} != tiler size {self.size}")
+        w, h = self.size
 
-    big.paste(rgba, (0, 0))
-    big.paste(rgba.transpose(Image.Transpose.FLIP_LEFT_RIGHT), (w, 0))
-    big.paste(rgba.transpose(Image.Transpose.FLIP_TOP_BOTTOM), (0, h))
-    big.paste(rgba.transpose(Image.Transpose.ROTATE_180), (w, h))
+        big = self.big
+        big.paste(rgba, (0, 0))
+        big.paste(rgba.transpose(Image.Transpose.FLIP_LEFT_RIGHT), (w, 0))
+        big.paste(rgba.transpose(Image.Transpose.FLIP_TOP_BOTTOM), (0, h))
+        big.paste(rgba.transpose(Image.Transpose.ROTATE_180), (w, h))
 
-    left = w // 2
-    top = h // 2
-    return big.crop((left, top, left + w, top + h))
+        return big.crop(self.box)
+
+
+def make_seamless_frame(frame: Image.Image) -> Image.Image:
+    return SeamlessTiler(frame.size).tile(frame)
 
 
 def is_animated(img: Image.Image) -> bool:
@@ -47,8 +63,9 @@ def main() -> None:
         frames: List[Image.Image] = []
         durations: List[int] = []
 
+        tiler = SeamlessTiler(img.size)
         for f in ImageSequence.Iterator(img):
-            frames.append(make_seamless_frame(f))
+            frames.append(tiler.tile(f))
             durations.append(int(f.info.get("duration", img.info.get("duration", 80))))
 
         loop = int(img.info.get("loop", 0))
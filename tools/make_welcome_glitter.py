@@ -4,8 +4,9 @@ import math
 import random
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Tuple
+from typing import List
 
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 
 
@@ -44,13 +45,16 @@ def binary_mask_multiline(w: int, h: int, text: str, font: ImageFont.ImageFont)
     return mask.point(lambda p: 255 if p >= 110 else 0)
 
 
-def draw_star(draw: ImageDraw.ImageDraw, cx: int, cy: int, r: int, color: Tuple[int, int, int]) -> None:
+def draw_star(draw: ImageDraw.ImageDraw, cx: int, cy: int, r: int, color: int, center: int) -> None:
+    """
+    Draw on a "P" image: color/center are palette indices, so no per-frame quantize is needed.
+    """
     draw.line((cx - r, cy, cx + r, cy), fill=color, width=1)
     draw.line((cx, cy - r, cx, cy + r), fill=color, width=1)
     rr = max(1, r - 1)
     draw.line((cx - rr, cy - rr, cx + rr, cy + rr), fill=color, width=1)
     draw.line((cx - rr, cy + rr, cx + rr, cy - rr), fill=color, width=1)
-    draw.rectangle((cx, cy, cx, cy), fill=(255, 255, 255))
+    draw.rectangle((cx, cy, cx, cy), fill=center)
 
 
 def main() -> None:
@@ -78,21 +82,20 @@ def main() -> None:
     )
 
     mask = binary_mask_multiline(w, h, text, font)
-    mask_px = mask.load()
 
     base = Image.new("RGB", (w, h), key)
     base.paste(Image.new("RGB", (w, h), red), mask=mask)
 
+    # Sample sparkle positions uniformly from the text pixels, no rejection loop.
+    ys, xs = np.nonzero(np.asarray(mask, dtype=np.uint8))
+
     rng = random.Random(1337)
-    sparkles: List[Sparkle] = []
     target = 20
-    tries = 0
-    while len(sparkles) < target and tries < 200000:
-        tries += 1
-        x = rng.randrange(0, w)
-        y = rng.randrange(0, h)
-        if mask_px[x, y] > 0:
-            sparkles.append(Sparkle(x=x, y=y, r=rng.choice([2, 3, 4]), phase=rng.randrange(0, frames_n)))
+    picks = rng.sample(range(len(xs)), min(target, len(xs)))
+    sparkles: List[Sparkle] = [
+        Sparkle(x=int(xs[i]), y=int(ys[i]), r=rng.choice([2, 3, 4]), phase=rng.randrange(0, frames_n))
+        for i in picks
+    ]
 
     palette = []
     palette += [key[0], key[1], key[2]]        # 0
@@ -102,22 +105,27 @@ def main() -> None:
 
     palette += [0, 0, 0] * (256 - 4)
 
+    sparkle_a_idx = 2
+    sparkle_b_idx = 3
+
     pal_img = Image.new("P", (1, 1))
     pal_img.putpalette(palette)
 
+    # Quantize once; sparkles are painted as palette indices into copies of the base.
+    base_p = base.quantize(palette=pal_img, dither=Image.Dither.NONE)
+
     frames_p: List[Image.Image] = []
     for i in range(frames_n):
-        fr = base.copy()
+        fr = base_p.copy()
         d = ImageDraw.Draw(fr)
 
         for sp in sparkles:
             t = (i - sp.phase) % frames_n
             if t in (0, 1, 2, frames_n - 1):
-                color = sparkle_a if t in (0, frames_n - 1) else sparkle_b
-                draw_star(d, sp.x, sp.y, sp.r, color)
+                color = sparkle_a_idx if t in (0, frames_n - 1) else sparkle_b_idx
+                draw_star(d, sp.x, sp.y, sp.r, color, center=sparkle_a_idx)
 
-        p = fr.quantize(palette=pal_img, dither=Image.Dither.NONE)
-        frames_p.append(p)
+        frames_p.append(fr)
 
     frames_p[0].save(
         out,
@@ -8,138 +8,175 @@ Sync CSP script hashes for inline <script> blocks.
   - Removes existing hash tokens (sha256/sha384/sha512) from script-src (+ script-src-elem if present)
   - Appends the newly computed sha256 hashes (quoted)
   - Rewrites CSP content as a single line
+- Remembers files that needed no change (keyed by mtime+size) so unchanged pages are not re-read
+- With --check, exits non-zero if any page's hashes are out of date (for CI)
 """
 
 from __future__ import annotations
 
 import argparse
 import base64
+import functools
 import hashlib
+import json
+import mmap
+import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 
-SCRIPT_TAG_RE = re.compile(
-    r"<script\b(?P<attrs>[^>]*)>(?P<body>.*?)</script>",
-    re.IGNORECASE | re.DOTALL,
+# One pass over the raw UTF-8 bytes finds both <script> and <meta> opening tags. Script bodies
+# are not matched by the regex; their "</script>" end is located with bytes.find instead.
+HTML_SCAN_RE = re.compile(
+    rb"<(?:script\b(?P<sattrs>[^>]*)|meta\b(?P<mattrs>[^>]*))>",
+    re.IGNORECASE,
 )
-
-META_TAG_RE = re.compile(r"<meta\b[^>]*>", re.IGNORECASE | re.DOTALL)
+SCRIPT_END = b"</script>"
+SCRIPT_END_RE = re.compile(re.escape(SCRIPT_END), re.IGNORECASE)
 CSP_HTTP_EQUIV_RE = re.compile(
-    r"http-equiv\s*=\s*([\"'])Content-Security-Policy\1", re.IGNORECASE
+    rb"\bhttp-equiv\s*=\s*([\"'])Content-Security-Policy\1", re.IGNORECASE
 )
+CSP_MARKER = b"content-security-policy"
 CONTENT_ATTR_RE = re.compile(
-    r"\bcontent\s*=\s*(?P<q>[\"'])(?P<v>.*?)(?P=q)", re.IGNORECASE | re.DOTALL
+    rb"\bcontent\s*=\s*(?P<q>[\"'])(?P<v>.*?)(?P=q)", re.IGNORECASE | re.DOTALL
 )
-SRC_ATTR_RE = re.compile(r"\bsrc\s*=", re.IGNORECASE)
-TYPE_ATTR_RE = re.compile(r"\btype\s*=\s*([\"'])(?P<t>.*?)\1", re.IGNORECASE | re.DOTALL)
+SRC_ATTR_RE = re.compile(rb"\bsrc\s*=", re.IGNORECASE)
+NEWLINE_RE = re.compile(rb"\r\n?")
+
+SCRIPT_DIRECTIVES = frozenset({"script-src", "script-src-elem"})
+
+PARALLEL_MIN_FILES = 32
+MMAP_MIN_BYTES = 64 * 1024
+
+# Stored in every result cache entry. Bump it whenever the rules behind a cached verdict change
+# (gates, CRLF handling, hash/directive rules) so "up-to-date" entries from older runs are redone.
+CACHE_VERSION = 1
+
+_DIGEST_CACHE: Dict[bytes, str] = {}
 
 
 @dataclass(frozen=True)
-class CspDirective:
-    name: str
-    values: List[str]
+class CspMeta:
+    start: int
+    end: int
+    tag: bytes
+    content: str
+    # Span of the content="..." attribute within tag, and its quote character.
+    content_start: int
+    content_end: int
+    quote: bytes
 
 
-def _sha256_b64(s: str) -> str:
-    digest = hashlib.sha256(s.encode("utf-8")).digest()
-    return base64.b64encode(digest).decode("ascii")
+@dataclass(frozen=True)
+class FileResult:
+    touched: bool = False
+    skipped_no_csp: bool = False
+    message: Optional[str] = None
+    # For untouched files: why nothing changed (None, "no-csp" or "up-to-date"). Cached as-is.
+    status: Optional[str] = None
+
+
+def _unchanged_result(fp: Path, status: Optional[str]) -> FileResult:
+    if status == "no-csp":
+        return FileResult(
+            skipped_no_csp=True,
+            message=f"[warn] {fp}: has inline <script> but no CSP meta (http-equiv). Skipping.",
+            status=status,
+        )
+    if status == "up-to-date":
+        return FileResult(message=f"[skip] {fp}: hashes already up to date.", status=status)
+    return FileResult()
+
+
+def _sha256_b64_batch(bodies: List[bytes | memoryview]) -> List[str]:
+    # Site-wide snippets (JSON-LD, counters) repeat across pages; hash each distinct body once.
+    # Read-only memoryviews hash and compare like bytes, so buffer slices are looked up without
+    # a copy. Only a miss stores one, which keeps the cache from pinning whole file buffers.
+    cache = _DIGEST_CACHE
+    sha256 = hashlib.sha256
+    b64encode = base64.b64encode
+
+    out: List[str] = []
+    for data in bodies:
+        h = cache.get(data)
+        if h is None:
+            h = b64encode(sha256(data).digest()).decode("ascii")
+            cache[data if isinstance(data, bytes) else data.tobytes()] = h
+        out.append(h)
+    return out
+
+
+_HASH_PREFIXES = ("sha256-", "sha384-", "sha512-", "'sha256-", "'sha384-", "'sha512-")
 
 
 def _is_hash_token(token: str) -> bool:
-    t = token.strip()
-    if len(t) >= 2 and t[0] == "'" and t[-1] == "'":
-        t = t[1:-1]
-    return t.startswith("sha256-") or t.startswith("sha384-") or t.startswith("sha512-")
+    # Quoted or bare; one startswith call instead of slicing the quotes off. Tokens come from
+    # str.split(), so there is no surrounding whitespace to strip.
+    return token.startswith(_HASH_PREFIXES)
 
 
-def _parse_csp(csp: str) -> List[CspDirective]:
-    normalized = " ".join(csp.replace("\r", "\n").split())
-    parts = [p.strip() for p in normalized.split(";")]
-    directives: List[CspDirective] = []
+def _update_directive_values(values: List[str], wanted_tokens: List[str]) -> Tuple[List[str], bool]:
+    """
+    Drop existing hash tokens, then append wanted ones not already present.
 
-    for p in parts:
-        if p == "":
+    Returns (new_values, changed); only a real difference counts as a change.
+    """
+    kept: List[str] = []
+    kept_set = set()
+    for v in values:
+        if _is_hash_token(v):
             continue
-        tokens = p.split()
-        name = tokens[0].strip().lower()
-        values = tokens[1:] if len(tokens) > 1 else []
-        directives.append(CspDirective(name=name, values=values))
+        kept.append(v)
+        kept_set.add(v)
 
-    return directives
+    for ht in wanted_tokens:
+        if ht not in kept_set:
+            kept.append(ht)
+            kept_set.add(ht)
 
+    return kept, kept != values
 
-def _render_csp(directives: List[CspDirective]) -> str:
-    rendered: List[str] = []
-    for d in directives:
-        if len(d.values) == 0:
-            rendered.append(d.name)
-        else:
-            rendered.append(f"{d.name} {' '.join(d.values)}")
-    return "; ".join(rendered)
 
+def _rewrite_csp(csp: str, wanted_tokens: List[str]) -> Tuple[Optional[str], bool]:
+    """
+    Parse, update script directives and re-render the policy in one pass over its directives.
 
-def _update_hashes_for_directives(
-    directives: List[CspDirective],
-    directive_names: List[str],
-    hashes: List[str],
-) -> Tuple[List[CspDirective], bool]:
-    wanted_hash_tokens = [f"'sha256-{h}'" for h in hashes]
-    changed = False
-
-    out: List[CspDirective] = []
+    Returns (new_csp, changed). new_csp is single-line; None if no script directive is present.
+    """
+    rendered: List[str] = []
     found_any = False
+    changed = False
 
-    for d in directives:
-        if d.name not in directive_names:
-            out.append(d)
+    for part in csp.split(";"):
+        tokens = part.split()
+        if len(tokens) == 0:
             continue
+        name = tokens[0].lower()
 
-        found_any = True
-        kept: List[str] = []
-        for v in d.values:
-            if _is_hash_token(v):
-                changed = True
-                continue
-            kept.append(v)
-
-        for ht in wanted_hash_tokens:
-            if ht not in kept:
-                kept.append(ht)
-                changed = True
-
-        out.append(CspDirective(name=d.name, values=kept))
+        if name in SCRIPT_DIRECTIVES:
+            found_any = True
+            values, directive_changed = _update_directive_values(tokens[1:], wanted_tokens)
+            changed = changed or directive_changed
+            rendered.append(" ".join([name, *values]))
+        else:
+            tokens[0] = name
+            rendered.append(" ".join(tokens))
 
     if found_any is False:
-        return directives, False
+        return None, False
 
-    return out, changed
+    return "; ".join(rendered), changed
 
 
-def _find_csp_meta_tag(html: str) -> Optional[Tuple[re.Match[str], str, str]]:
-    for m in META_TAG_RE.finditer(html):
-        tag = m.group(0)
-        if CSP_HTTP_EQUIV_RE.search(tag) is None:
-            continue
-        cm = CONTENT_ATTR_RE.search(tag)
-        if cm is None:
-            continue
-        return m, tag, cm.group("v")
-    return None
-
-
-def _replace_meta_content(tag: str, new_content: str) -> str:
-    cm = CONTENT_ATTR_RE.search(tag)
-    if cm is None:
-        return tag
-    q = cm.group("q")
-    return CONTENT_ATTR_RE.sub(
-        lambda _m: f"content={q}{new_content}{q}",
-        tag,
-        count=1,
+def _replace_meta_content(meta: CspMeta, new_content: str) -> bytes:
+    # The attribute span was recorded by the scan, so the tag is not searched a second time.
+    tag, q = meta.tag, meta.quote
+    return b"".join(
+        (tag[: meta.content_start], b"content=", q, new_content.encode("utf-8"), q, tag[meta.content_end :])
     )
 
 
@@ -147,31 +184,206 @@ def _collect_html_files(root: Path) -> List[Path]:
     skip_dirs = {".git", "node_modules", "dist", "build", ".next", ".venv", "venv", "__pycache__"}
     results: List[Path] = []
 
-    for p in root.rglob("*.html"):
-        if any(part in skip_dirs for part in p.parts):
-            continue
-        results.append(p)
+    # Explicit scandir stack: skip-dirs are pruned before descending, and DirEntry type info
+    # avoids an extra stat per entry.
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    if e.name not in skip_dirs:
+                        stack.append(e.path)
+                elif e.name.endswith(".html"):
+                    results.append(Path(e.path))
 
     return sorted(results)
 
 
-def _extract_inline_script_bodies(html: str) -> List[str]:
-    bodies: List[str] = []
-    for m in SCRIPT_TAG_RE.finditer(html):
-        attrs = m.group("attrs") or ""
-        body = m.group("body") or ""
+def _csp_meta_from_match(m: re.Match[bytes]) -> Optional[CspMeta]:
+    attrs = m.group("mattrs")
+    # Substring gate before running any attribute regex on the tag.
+    if CSP_MARKER not in attrs.lower() or CSP_HTTP_EQUIV_RE.search(attrs) is None:
+        return None
+
+    tag = m.group(0)
+    cm = CONTENT_ATTR_RE.search(tag)
+    if cm is None:
+        return None
+    # Only the policy text itself is decoded for directive parsing.
+    return CspMeta(
+        start=m.start(),
+        end=m.end(),
+        tag=tag,
+        content=cm.group("v").decode("utf-8"),
+        content_start=cm.start(),
+        content_end=cm.end(),
+        quote=cm.group("q"),
+    )
+
+
+def _scan_html(
+    raw: bytes | mmap.mmap,
+    find_csp: bool = True,
+    lowered: Optional[bytes] = None,
+) -> Tuple[List[bytes | memoryview], Optional[CspMeta]]:
+    """
+    Inline script bodies and the first CSP <meta> tag (with content=), from one regex pass.
+
+    With find_csp=False, <meta> tags are not inspected at all. `lowered` is raw.lower(); without
+    it, "</script>" is found with a case-insensitive regex instead of building a lowered copy.
+    """
+    view = memoryview(raw)
+    bodies: List[bytes | memoryview] = []
+    csp_meta: Optional[CspMeta] = None
+    pos = 0
+
+    # Loop-invariant lookups bound once: locals are cheaper than globals/attributes per tag.
+    search = HTML_SCAN_RE.search
+    find_end = lowered.find if lowered is not None else None
+    append = bodies.append
+    end_len = len(SCRIPT_END)
+
+    while True:
+        m = search(raw, pos)
+        if m is None:
+            break
+        pos = m.end()
+
+        if m.group("mattrs") is not None:
+            if find_csp and csp_meta is None:
+                csp_meta = _csp_meta_from_match(m)
+            continue
+
+        start = pos
+        if find_end is not None:
+            end = find_end(SCRIPT_END, start)
+        else:
+            em = SCRIPT_END_RE.search(raw, start)
+            end = em.start() if em is not None else -1
+        if end < 0:
+            # Unclosed <script>: nothing to hash, keep scanning after the tag.
+            continue
+        pos = end + end_len
 
-        if SRC_ATTR_RE.search(attrs) is not None:
+        attrs = m.group("sattrs")
+        if b"src" in attrs.lower() and SRC_ATTR_RE.search(attrs) is not None:
             continue
 
         # Skip empty scripts (whitespace-only) to avoid adding pointless hashes.
-        if body.strip() == "":
+        if raw[start:end].strip() == b"":
             continue
 
         # Keep exact body (including indentation/newlines) because CSP hashes are exact.
-        bodies.append(body)
-
-    return bodies
+        # Browsers hash the parsed script text, and the HTML parser turns CRLF/CR into LF.
+        # One substitution pass straight from the buffer: no slice copy, no intermediate result.
+        if raw.find(b"\r", start, end) != -1:
+            append(NEWLINE_RE.sub(b"\n", view[start:end]))
+        else:
+            append(view[start:end])
+
+    return bodies, csp_meta
+
+
+def _process_buffer(
+    fp: Path,
+    raw: bytes | mmap.mmap,
+    lowered: Optional[bytes],
+) -> Tuple[FileResult, Optional[Tuple[CspMeta, bytes]]]:
+    """
+    Hash the page's inline scripts and rewrite its CSP meta tag in memory.
+
+    Returns (result, splice); splice is (old meta tag, new tag) when the file needs a change.
+    """
+    find_csp = True
+    if lowered is not None:
+        # Literal gates (C-level scans) before any regex: without both a <script> and a
+        # </script> there is no inline body to hash.
+        if lowered.find(b"<script") < 0 or lowered.find(SCRIPT_END) < 0:
+            return FileResult(), None
+        find_csp = lowered.find(CSP_MARKER) >= 0
+    elif SCRIPT_END_RE.search(raw) is None:
+        return FileResult(), None
+
+    bodies, csp_meta = _scan_html(raw, find_csp=find_csp, lowered=lowered)
+    if len(bodies) == 0:
+        return FileResult(), None
+
+    if csp_meta is None:
+        return _unchanged_result(fp, "no-csp"), None
+
+    # Dedup while preserving order: identical blocks need one source expression, not two.
+    hashes = list(dict.fromkeys(_sha256_b64_batch(bodies)))
+
+    old_tag, old_csp = csp_meta.tag, csp_meta.content
+    new_csp, changed = _rewrite_csp(old_csp, [f"'sha256-{h}'" for h in hashes])
+
+    if new_csp is None:
+        return FileResult(), None
+    if changed is False:
+        return _unchanged_result(fp, "up-to-date"), None
+
+    new_tag = _replace_meta_content(csp_meta, new_csp)
+    if new_tag == old_tag:
+        return _unchanged_result(fp, "up-to-date"), None
+
+    result = FileResult(touched=True, message=f"[ok] {fp}: updated script hashes ({len(hashes)} inline block(s))")
+    return result, (csp_meta, new_tag)
+
+
+def _process_file(fp: Path, write: bool) -> FileResult:
+    tail: bytes | memoryview = b""
+    with fp.open("rb") as f:
+        if os.fstat(f.fileno()).st_size < MMAP_MIN_BYTES:
+            raw = f.read()
+            result, splice = _process_buffer(fp, raw, raw.lower())
+            if write and splice is not None:
+                tail = memoryview(raw)[splice[0].end :]
+        else:
+            # Large pages are mapped instead of copied, and scanned without a lowered copy. The
+            # write below changes the mapped file, so only the tail is copied out beforehand.
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                result, splice = _process_buffer(fp, mm, None)
+                if write and splice is not None:
+                    tail = mm[splice[0].end :]
+
+    if write and splice is not None:
+        # Splice in place: the bytes before the meta tag are left as they are on disk.
+        csp_meta, new_tag = splice
+        with fp.open("r+b") as f:
+            f.seek(csp_meta.start)
+            f.write(new_tag)
+            f.write(tail)
+            f.truncate()
+
+    return result
+
+
+def _load_result_cache(path: Path) -> Dict[str, Dict[str, Any]]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _save_result_cache(path: Path, cache: Dict[str, Dict[str, Any]]) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(cache, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    except OSError as e:
+        print(f"[warn] could not write cache {path}: {e}")
+
+
+def _cached_result(entry: Any, fp: Path, st: os.stat_result) -> Optional[FileResult]:
+    if (
+        isinstance(entry, dict)
+        and entry.get("version") == CACHE_VERSION
+        and entry.get("mtime_ns") == st.st_mtime_ns
+        and entry.get("size") == st.st_size
+        and entry.get("status") in (None, "no-csp", "up-to-date")
+    ):
+        return _unchanged_result(fp, entry.get("status"))
+    return None
 
 
 def main() -> int:
@@ -182,12 +394,26 @@ def main() -> int:
         default="",
         help="Project root directory (defaults to parent of tools/).",
     )
-    parser.add_argument(
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
         "--write",
         action="store_true",
         help="Write changes to files. Without this flag, runs in dry-run mode.",
     )
+    mode.add_argument(
+        "--check",
+        action="store_true",
+        help="Dry-run that exits with status 1 if any file would change (for CI).",
+    )
+    parser.add_argument(
+        "--cache",
+        type=str,
+        default=".cache/csp_sync.json",
+        help="Cache of files needing no change, keyed by mtime+size (relative to root). Empty disables it.",
+    )
     args = parser.parse_args()
+    do_write = args.write
+    do_check = args.check
 
     script_dir = Path(__file__).resolve().parent
     default_root = script_dir.parent
@@ -202,67 +428,76 @@ def main() -> int:
         print(f"[warn] no .html files found under: {root}")
         return 0
 
-    touched = 0
-    skipped_no_csp = 0
+    cache_path = (root / args.cache) if args.cache.strip() != "" else None
+    cache = _load_result_cache(cache_path) if cache_path is not None else {}
+    new_cache: Dict[str, Dict[str, Any]] = {}
 
+    # Files whose mtime+size match a cached "nothing to change" entry are not read at all.
+    results: List[Optional[FileResult]] = []
+    pending: List[Tuple[int, Path, str, os.stat_result]] = []
+    cached_result = _cached_result
+    cache_get = cache.get
     for fp in html_files:
-        original = fp.read_text(encoding="utf-8")
+        key = fp.relative_to(root).as_posix()
+        st = fp.stat()
+        res = cached_result(cache_get(key), fp, st)
+        if res is not None:
+            new_cache[key] = cache[key]
+        else:
+            pending.append((len(results), fp, key, st))
+        results.append(res)
+
+    # Files are independent, and the regex/CSP work is CPU-bound, so use processes. map() keeps
+    # output in file order. Small trees run inline: worker startup would cost more than it saves.
+    work = functools.partial(_process_file, write=do_write)
+    pending_files = [fp for _, fp, _, _ in pending]
+    if len(pending_files) < PARALLEL_MIN_FILES:
+        fresh = [work(fp) for fp in pending_files]
+    else:
+        cpus = os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=cpus) as ex:
+            fresh = list(ex.map(work, pending_files, chunksize=max(1, len(pending_files) // (4 * cpus))))
+
+    for (i, _, key, st), res in zip(pending, fresh):
+        results[i] = res
+        # Touched files are left out: they either changed on disk or still need a change.
+        if res.touched is False:
+            new_cache[key] = {
+                "version": CACHE_VERSION,
+                "mtime_ns": st.st_mtime_ns,
+                "size": st.st_size,
+                "status": res.status,
+            }
+
+    if cache_path is not None and new_cache != cache:
+        _save_result_cache(cache_path, new_cache)
 
-        bodies = _extract_inline_script_bodies(original)
-        if len(bodies) == 0:
-            continue
+    touched = 0
+    skipped_no_csp = 0
 
-        # Dedup while preserving order.
-        seen = set()
-        hashes: List[str] = []
-        for b in bodies:
-            h = _sha256_b64(b)
-            if h in seen:
-                continue
-            seen.add(h)
-            hashes.append(h)
-
-        csp_meta = _find_csp_meta_tag(original)
-        if csp_meta is None:
+    for res in results:
+        if res.message is not None:
+            print(res.message)
+        if res.touched:
+            touched += 1
+        if res.skipped_no_csp:
             skipped_no_csp += 1
-            print(f"[warn] {fp}: has inline <script> but no CSP meta (http-equiv). Skipping.")
-            continue
-
-        meta_match, old_tag, old_csp = csp_meta
-        directives = _parse_csp(old_csp)
-
-        updated, changed_a = _update_hashes_for_directives(directives, ["script-src"], hashes)
-        updated, changed_b = _update_hashes_for_directives(updated, ["script-src-elem"], hashes)
-        changed = (changed_a is True) or (changed_b is True)
-
-        if changed is False:
-            continue
-
-        new_csp = _render_csp(updated)
-        new_tag = _replace_meta_content(old_tag, new_csp)
-        updated_html = original[: meta_match.start()] + new_tag + original[meta_match.end() :]
-
-        if updated_html == original:
-            print(f"[skip] {fp}: hashes already up to date.")
-            continue
-
-        touched += 1
-        print(f"[ok] {fp}: updated script hashes ({len(hashes)} inline block(s))")
-
-        if args.write:
-            fp.write_text(updated_html, encoding="utf-8")
 
     if touched == 0:
         print("[done] no changes needed.")
     else:
-        if args.write:
+        if do_write:
             print(f"[done] wrote changes to {touched} file(s).")
+        elif do_check:
+            print(f"[done] check: {touched} file(s) have out-of-date script hashes.")
         else:
             print(f"[done] dry-run: {touched} file(s) would change. Re-run with --write.")
 
     if skipped_no_csp > 0:
         print(f"[note] {skipped_no_csp} file(s) had inline <script> but no CSP meta. Add CSP or handle separately.")
 
+    if do_check and touched > 0:
+        return 1
     return 0
 
 